@@ -6,28 +6,37 @@ import sys
 import json
 import sqlite3
 import hashlib
+import mmap
 import logging
 import threading
 import queue
+import shutil
+import tempfile
 import time
 import yaml
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
 from concurrent.futures import ThreadPoolExecutor
 import zipfile
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 from cryptography.hazmat.primitives import hashes
 # Try to import magic, fall back to mimetypes if not available
+import mimetypes
 try:
     import magic
     MAGIC_AVAILABLE = True
 except ImportError:
-    import mimetypes
     MAGIC_AVAILABLE = False
     print("Warning: python-magic not available, using mimetypes for file type detection")
+# Try to import orjson for faster JSON export, fall back to json if not available
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 import csv
 
 # Configure logging
@@ -41,7 +50,53 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Files at or above this size are hashed through mmap instead of a single read
+MMAP_HASH_THRESHOLD = 1024 * 1024  # 1MB
+# Read size for files that cannot be memory-mapped
+HASH_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Leading-byte signatures for common evidence types, checked before libmagic
+FILE_SIGNATURES = (
+    (b'%PDF-', 'application/pdf'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'PK\x03\x04', 'application/zip'),
+    (b'\x1f\x8b', 'application/gzip'),
+    (b'SQLite format 3\x00', 'application/vnd.sqlite3'),
+    (b'\x7fELF', 'application/x-executable'),
+)
+# Enough leading bytes to reach the PE header offset (e_lfanew) of MZ files
+SIGNATURE_READ_SIZE = 64
+
+# Office Open XML formats are ZIP containers; only these may refine a ZIP match
+OOXML_MIME_TYPES = {
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.pptx': 'application/vnd.openxmlformats-officedocument.presentationml.presentation',
+}
+
+# Memory-mapped I/O window for read-only database connections
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024  # 256MB
+
+# Copy buffer for streaming files into evidence packages
+PACKAGE_COPY_BUFFER_SIZE = 1024 * 1024  # 1MB
+
+# Basic file extension mapping, used when no other detection succeeds
+EXTENSION_MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    '.txt': 'text/plain',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.zip': 'application/zip',
+    '.exe': 'application/x-executable'
+}
+
+@dataclass(slots=True)
 class EvidenceRecord:
     """Data model for evidence records following ISO/NIST standards"""
     """
@@ -52,6 +107,8 @@ class EvidenceRecord:
     - IDE autocomplete improves developer productivity
     - Clear schema documentation for forensic analysts
     - Easier serialization to database/JSON
+    - slots=True drops the per-instance __dict__, keeping large
+      collections compact in memory
     """
     id: str  # uuid ensures global uniqueness across cases
     case_id: str  # links evidence to specific investigation
@@ -62,7 +119,7 @@ class EvidenceRecord:
     modified_time: datetime  # last modification (key for timeline analysis)
     accessed_time: datetime  # last access (unreliable on some systems)
     owner: str  # ownership for attribution and access control investigation
-    file_type: str  # MIME type from libmagic for reliable classification
+    file_type: str  # MIME type from content signature or libmagic for reliable classification
     extension: str  # original extension preserved for context even if spoofed
     sha256: str  # sha-256 chosen per NIST SP 800-86 for court admissibility
     yara_tags: List[str]  # pattern match results for triage prioritization
@@ -71,7 +128,7 @@ class EvidenceRecord:
     notes: str = ""  # additional context for analysts
     
 
-@dataclass
+@dataclass(slots=True)
 class ChainEntry:
     """Chain of custody entry for audit trail"""
     id: str
@@ -90,9 +147,22 @@ class DatabaseManager:
         self.db_path = db_path
         self.init_database()
     
+    def get_connection(self, read_only: bool = False) -> sqlite3.Connection:
+        """Open a database connection tuned for writing or for read-only queries"""
+        conn = sqlite3.connect(self.db_path)
+        if read_only:
+            # Serve reads straight from memory-mapped pages and refuse writes
+            conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+            conn.execute("PRAGMA query_only=1")
+        else:
+            # WAL makes NORMAL sync safe and avoids an fsync on every commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+    
     def init_database(self):
         """Initialize database with required tables"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
+        conn.execute("PRAGMA journal_mode=WAL")
         cursor = conn.cursor()
         
         # Evidence records table
@@ -135,28 +205,45 @@ class DatabaseManager:
         conn.close()
         logger.info(f"Database initialized at {self.db_path}")
     
+    @staticmethod
+    def _evidence_row(record: EvidenceRecord) -> tuple:
+        """Convert evidence record to a database row"""
+        return (
+            record.id, record.case_id, record.file_path, record.rel_path,
+            record.size, record.created_time.isoformat(), record.modified_time.isoformat(),
+            record.accessed_time.isoformat(), record.owner, record.file_type,
+            record.extension, record.sha256, json.dumps(record.yara_tags),
+            record.collected_by, record.collected_at.isoformat(), record.notes
+        )
+    
     def insert_evidence(self, record: EvidenceRecord):
         """Insert evidence record into database"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
             INSERT INTO evidence_records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            record.id, record.case_id, record.file_path, record.rel_path,
-            record.size, record.created_time.isoformat(), record.modified_time.isoformat(),
-            record.accessed_time.isoformat(), record.owner, record.file_type,
-            record.extension, record.sha256, json.dumps(record.yara_tags),
-            record.collected_by, record.collected_at.isoformat(), record.notes
-        ))
+        """, self._evidence_row(record))
         
         conn.commit()
         conn.close()
         logger.info(f"Evidence record inserted: {record.id}")
     
+    def insert_evidence_many(self, records: List[EvidenceRecord]):
+        """Insert evidence records into database in a single transaction"""
+        conn = self.get_connection()
+        
+        with conn:
+            conn.executemany("""
+                INSERT INTO evidence_records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [self._evidence_row(record) for record in records])
+        
+        conn.close()
+        logger.info(f"Evidence records inserted: {len(records)}")
+    
     def insert_chain_entry(self, entry: ChainEntry):
         """Insert chain of custody entry"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
@@ -169,6 +256,32 @@ class DatabaseManager:
         conn.commit()
         conn.close()
         logger.info(f"Chain entry recorded: {entry.action} by {entry.actor}")
+    
+    def snapshot_database(self, snapshot_path: str):
+        """Copy the database, including rows still held in the WAL, into a standalone file"""
+        source = self.get_connection(read_only=True)
+        target = sqlite3.connect(snapshot_path)
+        
+        # The backup API reads through SQLite, so committed WAL frames are
+        # included even when open connections prevent a checkpoint
+        source.backup(target)
+        target.execute("PRAGMA journal_mode=DELETE")
+        
+        target.close()
+        source.close()
+        logger.info(f"Database snapshot written: {snapshot_path}")
+    
+    def fetch_case_evidence(self, case_id: str) -> Tuple[List[str], List[tuple]]:
+        """Fetch column names and evidence rows for a case"""
+        conn = self.get_connection(read_only=True)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT * FROM evidence_records WHERE case_id = ?", (case_id,))
+        columns = [column[0] for column in cursor.description]
+        rows = cursor.fetchall()
+        
+        conn.close()
+        return columns, rows
 
 class Agent:
     """Base class for BDI-inspired agents"""
@@ -222,15 +335,86 @@ class DiscoveryAgent(Agent):
         super().__init__("Discovery", db_manager)
         self.config = config
         self.target_extensions = config.get('target_extensions', ['.pdf', '.docx', '.xlsx', '.jpg', '.zip'])
+        # Hashed, case-normalised copy for constant-time lookups per file
+        self.target_extension_set = frozenset(ext.lower() for ext in self.target_extensions)
+        # Most dot-separated parts in any target extension, e.g. 2 for '.tar.gz'
+        self.max_extension_parts = max((ext.count('.') for ext in self.target_extension_set), default=1)
         self.scan_paths = config.get('scan_paths', ['.'])
         self.exclude_paths = config.get('exclude_paths', [])
         self.max_file_size = config.get('max_file_size', 100 * 1024 * 1024)  # 100MB
+        self.max_workers = config.get('max_workers', os.cpu_count() or 1)
         self.file_queue = None
+        self.stat_cache = None
     
     def set_file_queue(self, file_queue: queue.Queue):
         """Set the queue for discovered files"""
         self.file_queue = file_queue
     
+    def set_stat_cache(self, stat_cache: Dict[str, os.stat_result]):
+        """Set the shared cache that records stat results of discovered files"""
+        self.stat_cache = stat_cache
+    
+    def matches_extension(self, file_name: str) -> bool:
+        """Check whether a file name ends in a target extension, including compound ones"""
+        name = file_name.lower()
+        end = len(name)
+        
+        # Probe each dotted suffix from the shortest up to the longest target,
+        # so the cost depends on extension length rather than the number of targets
+        for _ in range(self.max_extension_parts):
+            dot = name.rfind('.', 0, end)
+            if dot <= 0:
+                return False
+            if name[dot:] in self.target_extension_set:
+                return True
+            end = dot
+        
+        return False
+    
+    def scan_directory(self, directory: str):
+        """Scan one directory, returning matching files and subdirectories to descend into"""
+        matched_files = []
+        subdirectories = []
+        
+        try:
+            with os.scandir(directory or '.') as entries:
+                for entry in entries:
+                    # Build paths the same way pathlib does so exclusions match
+                    file_path = os.path.join(directory, entry.name)
+                    
+                    # Check exclusions
+                    if any(file_path.startswith(exclude) for exclude in self.exclude_paths):
+                        continue
+                    
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(file_path)
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+                    
+                    # Check extension
+                    if not self.matches_extension(entry.name):
+                        continue
+                    
+                    # Check file size
+                    try:
+                        file_stat = entry.stat()
+                        if file_stat.st_size > self.max_file_size:
+                            logger.info(f"File too large, skipping: {file_path}")
+                            continue
+                    except OSError as e:
+                        logger.warning(f"Cannot stat file {file_path}: {e}")
+                        continue
+                    
+                    matched_files.append((file_path, file_stat))
+        except OSError as e:
+            logger.warning(f"Cannot scan directory {directory}: {e}")
+        
+        return matched_files, subdirectories
+    
     def discover_files(self):
         """Discover files matching criteria"""
         discovered_count = 0
@@ -243,33 +427,24 @@ class DiscoveryAgent(Agent):
             
             logger.info(f"Scanning path: {scan_path}")
             
-            for file_path in path.rglob('*'):
-                if not file_path.is_file():
-                    continue
-                
-                # Check exclusions
-                if any(str(file_path).startswith(exclude) for exclude in self.exclude_paths):
-                    continue
-                
-                # Check extension
-                if file_path.suffix.lower() not in self.target_extensions:
-                    continue
-                
-                # Check file size
-                try:
-                    file_size = file_path.stat().st_size
-                    if file_size > self.max_file_size:
-                        logger.info(f"File too large, skipping: {file_path}")
-                        continue
-                except OSError as e:
-                    logger.warning(f"Cannot stat file {file_path}: {e}")
-                    continue
-                
-                # Add to processing queue
-                if self.file_queue:
-                    self.file_queue.put(str(file_path))
-                    discovered_count += 1
-                    logger.debug(f"Discovered file: {file_path}")
+            # Walk the tree level by level, scanning each level's directories
+            # concurrently so directory reads and stats overlap in the kernel
+            pending = ['' if str(path) == '.' else str(path)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while pending:
+                    next_pending = []
+                    for matched_files, subdirectories in executor.map(self.scan_directory, pending):
+                        next_pending.extend(subdirectories)
+                        
+                        # Add to processing queue, keeping the stat result for processing
+                        for file_path, file_stat in matched_files:
+                            if self.file_queue:
+                                if self.stat_cache is not None:
+                                    self.stat_cache[file_path] = file_stat
+                                self.file_queue.put(file_path)
+                                discovered_count += 1
+                                logger.debug(f"Discovered file: {file_path}")
+                    pending = next_pending
         
         logger.info(f"Discovery complete. Found {discovered_count} files")
         return discovered_count
@@ -288,6 +463,8 @@ class ProcessingAgent(Agent):
         self.case_id = config.get('case_id', str(uuid.uuid4()))
         self.collected_by = config.get('collected_by', f"{os.getenv('USERNAME', 'unknown')}@{os.getenv('COMPUTERNAME', 'unknown')}")
         self.file_queue = None
+        self.stat_cache = None
+        self.max_workers = config.get('max_workers', os.cpu_count() or 1)
         
         # Initialize file type detector based on availability
         if MAGIC_AVAILABLE:
@@ -303,54 +480,108 @@ class ProcessingAgent(Agent):
         """Set the queue for files to process"""
         self.file_queue = file_queue
     
+    def set_stat_cache(self, stat_cache: Dict[str, os.stat_result]):
+        """Set the shared cache of discovery stat results, used to detect changed files"""
+        self.stat_cache = stat_cache
+    
     def calculate_sha256(self, file_path: str) -> str:
         """Calculate SHA-256 hash of file"""
-        sha256_hash = hashlib.sha256()
+        return self.hash_file(file_path)[0]
+    
+    def hash_file(self, file_path: str) -> Tuple[str, Optional[os.stat_result]]:
+        """Calculate SHA-256 hash of file along with the stat of the handle that was hashed"""
         try:
             with open(file_path, 'rb') as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    sha256_hash.update(chunk)
-            return sha256_hash.hexdigest()
+                stat_info = os.fstat(f.fileno())
+                size = stat_info.st_size
+                
+                # Small files are read in one call; larger files are mapped so
+                # the whole buffer is hashed by OpenSSL without chunking in Python
+                if size < MMAP_HASH_THRESHOLD:
+                    return hashlib.sha256(f.read()).hexdigest(), stat_info
+                
+                # Ask for aggressive readahead on large sequential reads
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+                
+                try:
+                    mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    # Some mounts and special files cannot be mapped; hash them in chunks
+                    sha256_hash = hashlib.sha256()
+                    buffer = bytearray(HASH_CHUNK_SIZE)
+                    view = memoryview(buffer)
+                    while True:
+                        bytes_read = f.readinto(buffer)
+                        if not bytes_read:
+                            break
+                        sha256_hash.update(view[:bytes_read])
+                    digest = sha256_hash.hexdigest()
+                else:
+                    with mm:
+                        if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                            mm.madvise(mmap.MADV_SEQUENTIAL)
+                        digest = hashlib.sha256(mm).hexdigest()
+                
+                # Drop hashed pages so a long collection does not evict the rest of the page cache
+                if hasattr(os, 'posix_fadvise'):
+                    os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+                
+                return digest, stat_info
         except Exception as e:
             logger.error(f"Error hashing file {file_path}: {e}")
-            return ""
+            return "", None
     
     def get_file_type(self, file_path: str) -> str:
-        """Get file type using libmagic or mimetypes as fallback"""
+        """Get file type from content signature, libmagic, or mimetypes as fallback"""
         try:
-            # Try libmagic first if available
+            ext = os.path.splitext(file_path)[1].lower()
+            
+            # Check leading bytes against known signatures
+            fd = os.open(file_path, os.O_RDONLY | getattr(os, 'O_BINARY', 0))
+            try:
+                header = os.read(fd, SIGNATURE_READ_SIZE)
+                
+                # 'MZ' alone matches ordinary text, so follow e_lfanew to the PE header
+                if header.startswith(b'MZ') and len(header) >= 0x40:
+                    os.lseek(fd, int.from_bytes(header[0x3C:0x40], 'little'), os.SEEK_SET)
+                    if os.read(fd, 4) == b'PE\x00\x00':
+                        return 'application/x-dosexec'
+            finally:
+                os.close(fd)
+            
+            for signature, mime_type in FILE_SIGNATURES:
+                if header.startswith(signature):
+                    # Office documents are ZIP containers; keep their specific type,
+                    # but never let any other extension relabel a ZIP
+                    if mime_type == 'application/zip':
+                        return OOXML_MIME_TYPES.get(ext, mime_type)
+                    return mime_type
+            
+            # Use libmagic for content outside the signature table
             if self.magic_detector:
                 return self.magic_detector.from_file(file_path)
             
-            # Fallback to mimetypes
+            # Fall back to mimetypes
             mime_type, _ = mimetypes.guess_type(file_path)
             if mime_type:
                 return mime_type
             
             # Final fallback - basic file extension mapping
-            ext = Path(file_path).suffix.lower()
-            extension_map = {
-                '.pdf': 'application/pdf',
-                '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                '.xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                '.txt': 'text/plain',
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.png': 'image/png',
-                '.zip': 'application/zip',
-                '.exe': 'application/x-executable'
-            }
-            
-            return extension_map.get(ext, 'application/octet-stream')
+            return EXTENSION_MIME_TYPES.get(ext, 'application/octet-stream')
             
         except Exception as e:
             logger.error(f"Error detecting file type for {file_path}: {e}")
             return "application/octet-stream"
     
-    def get_file_owner(self, file_path: Path) -> str:
+    def get_file_owner(self, file_path: Path, stat_info: Optional[os.stat_result] = None) -> str:
         """Get file owner in a cross-platform way"""
         try:
-            if hasattr(file_path, 'owner'):
+            if stat_info is not None and os.name == 'posix':
+                # Resolve owner from the existing stat result without another stat
+                import pwd
+                return pwd.getpwuid(stat_info.st_uid).pw_name
+            elif hasattr(file_path, 'owner'):
                 return file_path.owner()
             else:
                 # Fallback for POSIX systems
@@ -361,17 +592,31 @@ class ProcessingAgent(Agent):
             return os.getenv('USERNAME', 'unknown')
 
     
-    def extract_metadata(self, file_path: str) -> Optional[EvidenceRecord]:
+    def extract_metadata(self, file_path: str, collected_at: Optional[datetime] = None) -> Optional[EvidenceRecord]:
         """Extract metadata from file and create evidence record"""
         try:
             path = Path(file_path)
-            stat_info = path.stat()
             
-            # Calculate hash
-            sha256_hash = self.calculate_sha256(file_path)
+            # Calculate hash, taking metadata from the same open handle so
+            # size and timestamps describe the bytes that were hashed
+            sha256_hash, stat_info = self.hash_file(file_path)
+            
+            # Always release the discovery entry, even when hashing failed
+            discovered_stat = None
+            if self.stat_cache is not None:
+                discovered_stat = self.stat_cache.pop(file_path, None)
+            
             if not sha256_hash:
                 return None
             
+            # Flag files that changed between discovery and hashing
+            notes = ""
+            if discovered_stat is not None and (
+                (discovered_stat.st_size, discovered_stat.st_mtime_ns) != (stat_info.st_size, stat_info.st_mtime_ns)
+            ):
+                logger.warning(f"File changed between discovery and processing: {file_path}")
+                notes = "File changed between discovery and processing"
+            
             # Get file type
             file_type = self.get_file_type(file_path)
             
@@ -385,14 +630,14 @@ class ProcessingAgent(Agent):
                 created_time=datetime.fromtimestamp(stat_info.st_ctime, tz=timezone.utc),
                 modified_time=datetime.fromtimestamp(stat_info.st_mtime, tz=timezone.utc),
                 accessed_time=datetime.fromtimestamp(stat_info.st_atime, tz=timezone.utc),
-                owner=self.get_file_owner(path),
+                owner=self.get_file_owner(path, stat_info),
                 file_type=file_type,
-                extension=path.suffix.lower(),
+                extension=os.path.splitext(file_path)[1].lower(),
                 sha256=sha256_hash,
                 yara_tags=[],  # YARA scanning would be implemented here
                 collected_by=self.collected_by,
-                collected_at=datetime.now(timezone.utc),
-                notes=""
+                collected_at=collected_at or datetime.now(timezone.utc),
+                notes=notes
             )
             
             return record
@@ -401,6 +646,25 @@ class ProcessingAgent(Agent):
             logger.error(f"Error processing file {file_path}: {e}")
             return None
     
+    def process_batch(self, file_paths: List[str]) -> List[EvidenceRecord]:
+        """Process a batch of files in parallel and store their evidence records"""
+        # One collection timestamp is shared by every record in the batch
+        collected_at = datetime.now(timezone.utc)
+        
+        # File reads, hashing and libmagic release the GIL, so worker threads
+        # overlap I/O and hashing across files
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(
+                lambda file_path: self.extract_metadata(file_path, collected_at=collected_at),
+                file_paths
+            ))
+        
+        records = [record for record in results if record]
+        if records:
+            self.db_manager.insert_evidence_many(records)
+        
+        return records
+    
     def process_files(self):
         """Process files from queue"""
         processed_count = 0
@@ -408,17 +672,24 @@ class ProcessingAgent(Agent):
         while self.running:
             try:
                 if self.file_queue and not self.file_queue.empty():
-                    file_path = self.file_queue.get(timeout=1)
+                    # Drain everything queued so far into one batch
+                    file_paths = []
+                    while True:
+                        try:
+                            file_paths.append(self.file_queue.get_nowait())
+                        except queue.Empty:
+                            break
                     
-                    logger.info(f"Processing file: {file_path}")
-                    record = self.extract_metadata(file_path)
-                    
-                    if record:
-                        self.db_manager.insert_evidence(record)
-                        processed_count += 1
-                        logger.info(f"Processed file: {file_path} (Hash: {record.sha256[:16]}...)")
-                    
-                    self.file_queue.task_done()
+                    try:
+                        logger.info(f"Processing batch of {len(file_paths)} files")
+                        records = self.process_batch(file_paths)
+                        
+                        processed_count += len(records)
+                        for record in records:
+                            logger.info(f"Processed file: {record.rel_path} (Hash: {record.sha256[:16]}...)")
+                    finally:
+                        for _ in file_paths:
+                            self.file_queue.task_done()
                 else:
                     time.sleep(0.1)
                     
@@ -434,6 +705,32 @@ class ProcessingAgent(Agent):
         if action == "process":
             self.process_files()
 
+class HashingWriter:
+    """Write-only file wrapper that computes SHA-256 of everything written through it"""
+    
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+        self.sha256_hash = hashlib.sha256()
+        self.position = 0
+    
+    def write(self, data) -> int:
+        """Hash and write data"""
+        self.sha256_hash.update(data)
+        self.position += len(data)
+        return self.fileobj.write(data)
+    
+    def tell(self) -> int:
+        """Return number of bytes written so far"""
+        return self.position
+    
+    def flush(self):
+        """Flush the underlying file"""
+        self.fileobj.flush()
+    
+    def hexdigest(self) -> str:
+        """Return SHA-256 of all bytes written"""
+        return self.sha256_hash.hexdigest()
+
 class PackagingAgent(Agent):
     """Agent responsible for creating encrypted evidence packages"""
     
@@ -447,73 +744,84 @@ class PackagingAgent(Agent):
         # Generate encryption key (in production, use proper key management)
         self.encryption_key = AESGCM.generate_key(bit_length=256)
     
-    def export_to_csv(self) -> str:
+    def export_to_csv(self, case_evidence: Optional[Tuple[List[str], List[tuple]]] = None) -> str:
         """Export evidence records to CSV"""
         csv_path = self.output_dir / f"evidence_report_{self.case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
         
-        conn = sqlite3.connect(self.db_manager.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM evidence_records WHERE case_id = ?", (self.case_id,))
-        records = cursor.fetchall()
-        
-        # Get column names
-        cursor.execute("PRAGMA table_info(evidence_records)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
         with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
             writer = csv.writer(csvfile)
-            writer.writerow(columns)
-            writer.writerows(records)
+            
+            if case_evidence:
+                columns, rows = case_evidence
+                writer.writerow(columns)
+                writer.writerows(rows)
+            else:
+                # Stream rows from the cursor straight into the C writer without
+                # materialising the whole case
+                conn = self.db_manager.get_connection(read_only=True)
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM evidence_records WHERE case_id = ?", (self.case_id,))
+                
+                writer.writerow([column[0] for column in cursor.description])
+                writer.writerows(cursor)
+                conn.close()
         
-        conn.close()
         logger.info(f"CSV report exported: {csv_path}")
         return str(csv_path)
     
-    def export_to_json(self) -> str:
+    def export_to_json(self, case_evidence: Optional[Tuple[List[str], List[tuple]]] = None) -> str:
         """Export evidence records to JSON"""
         json_path = self.output_dir / f"evidence_report_{self.case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
         
-        conn = sqlite3.connect(self.db_manager.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM evidence_records WHERE case_id = ?", (self.case_id,))
-        records = cursor.fetchall()
-        
-        # Get column names
-        cursor.execute("PRAGMA table_info(evidence_records)")
-        columns = [column[1] for column in cursor.fetchall()]
+        columns, rows = case_evidence or self.db_manager.fetch_case_evidence(self.case_id)
         
         # Convert to list of dictionaries
-        json_records = []
-        for record in records:
-            json_records.append(dict(zip(columns, record)))
+        json_records = [dict(zip(columns, row)) for row in rows]
         
-        with open(json_path, 'w', encoding='utf-8') as jsonfile:
-            json.dump(json_records, jsonfile, indent=2, default=str)
+        if ORJSON_AVAILABLE:
+            # orjson encodes natively and hands back bytes for a single write
+            with open(json_path, 'wb') as jsonfile:
+                jsonfile.write(orjson.dumps(json_records, option=orjson.OPT_INDENT_2, default=str))
+        else:
+            with open(json_path, 'w', encoding='utf-8') as jsonfile:
+                json.dump(json_records, jsonfile, indent=2, default=str)
         
-        conn.close()
         logger.info(f"JSON report exported: {json_path}")
         return str(json_path)
     
     def create_package(self) -> str:
         """Create encrypted evidence package"""
-        # Export reports
-        csv_path = self.export_to_csv()
-        json_path = self.export_to_json()
+        # Export reports from a single query of the case; the JSON export
+        # needs every row in memory anyway, so the CSV shares that result
+        case_evidence = self.db_manager.fetch_case_evidence(self.case_id)
+        csv_path = self.export_to_csv(case_evidence)
+        json_path = self.export_to_json(case_evidence)
         
         # Create package
         package_path = self.output_dir / f"evidence_package_{self.case_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
         
-        with zipfile.ZipFile(package_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(csv_path, Path(csv_path).name)
-            zipf.write(json_path, Path(json_path).name)
+        # Package a snapshot rather than the live file, which may not yet
+        # hold rows committed to the WAL
+        snapshot_fd, snapshot_path = tempfile.mkstemp(suffix='.db', dir=self.output_dir)
+        os.close(snapshot_fd)
+        try:
+            self.db_manager.snapshot_database(snapshot_path)
             
-            # Add database
-            zipf.write(self.db_manager.db_path, "evidence.db")
+            with open(package_path, 'wb') as package_file:
+                # The writer is not seekable, so zipfile streams the archive strictly
+                # in order and the package hash is computed as it is written
+                writer = HashingWriter(package_file)
+                with zipfile.ZipFile(writer, 'w', zipfile.ZIP_DEFLATED) as zipf:
+                    self.add_to_package(zipf, csv_path, Path(csv_path).name)
+                    self.add_to_package(zipf, json_path, Path(json_path).name)
+                    
+                    # Add database
+                    self.add_to_package(zipf, snapshot_path, "evidence.db")
+        finally:
+            os.unlink(snapshot_path)
         
-        # Calculate package hash
-        package_hash = self.calculate_file_hash(str(package_path))
+        # Package hash without re-reading the written file
+        package_hash = writer.hexdigest()
         
         # Record chain of custody entry
         chain_entry = ChainEntry(
@@ -534,6 +842,16 @@ class PackagingAgent(Agent):
         
         return str(package_path)
     
+    def add_to_package(self, zipf: zipfile.ZipFile, file_path: str, arcname: str):
+        """Stream a file into the package archive using large copy buffers"""
+        zinfo = zipfile.ZipInfo.from_file(file_path, arcname)
+        zinfo.compress_type = zipf.compression
+        
+        # ZipFile.write copies in 8KB chunks; a larger buffer cuts the number
+        # of Python-level round trips through the compressor and hash writer
+        with open(file_path, 'rb') as src, zipf.open(zinfo, 'w') as dest:
+            shutil.copyfileobj(src, dest, PACKAGE_COPY_BUFFER_SIZE)
+    
     def calculate_file_hash(self, file_path: str) -> str:
         """Calculate SHA-256 hash of a file"""
         sha256_hash = hashlib.sha256()
@@ -554,6 +872,7 @@ class OrchestratorAgent(Agent):
         super().__init__("Orchestrator", db_manager)
         self.config = config
         self.file_queue = queue.Queue()
+        self.stat_cache = {}
         
         # Initialize other agents
         self.discovery_agent = DiscoveryAgent(db_manager, config)
@@ -563,6 +882,8 @@ class OrchestratorAgent(Agent):
         # Set up communication
         self.discovery_agent.set_file_queue(self.file_queue)
         self.processing_agent.set_file_queue(self.file_queue)
+        self.discovery_agent.set_stat_cache(self.stat_cache)
+        self.processing_agent.set_stat_cache(self.stat_cache)
     
     def start_collection(self):
         """Start the collection process"""
@@ -605,6 +926,7 @@ def load_config(config_path: str = "dfas_config.yaml") -> Dict[str, Any]:
         'exclude_paths': ['__pycache__', '.git', '.venv'],
         'target_extensions': ['.pdf', '.docx', '.xlsx', '.txt', '.jpg', '.png', '.zip'],
         'max_file_size': 100 * 1024 * 1024,  # 100MB
+        'max_workers': os.cpu_count() or 1,  # threads for discovery and processing
         'output_dir': './evidence_packages',
         'collected_by': f"{os.getenv('USERNAME', 'unknown')}@{os.getenv('COMPUTERNAME', 'unknown')}"
     }
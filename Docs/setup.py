@@ -47,6 +47,13 @@ def check_and_install_dependencies():
         else:
             print("⚠ python-magic installation failed (optional - will use fallback)")
     
+    # Try to install orjson for faster JSON reports
+    print("\nTrying to install orjson (optional)...")
+    if install_package("orjson"):
+        print("✓ orjson installed successfully")
+    else:
+        print("⚠ orjson installation failed (optional - will use fallback)")
+    
     print("\n" + "="*40)
     print("Setup complete! You can now run: python DFAS.py")
     return True
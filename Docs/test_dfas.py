@@ -4,14 +4,19 @@ Tests core functionality including hashing, file detection, and evidence handlin
 """
 
 import unittest
+import io
+import logging
 import os
 import tempfile
 import shutil
 import sqlite3
 import hashlib
+import zipfile
+from unittest import mock
 from pathlib import Path
 from datetime import datetime, timezone
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # Import DFAS modules
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -33,7 +38,7 @@ class TestDatabaseManager(unittest.TestCase):
     
     def test_database_initialization(self):
         """Test that database tables are created correctly"""
-        conn = sqlite3.connect(self.test_db.name)
+        conn = self.db_manager.get_connection(read_only=True)
         cursor = conn.cursor()
         
         # Check evidence_records table exists
@@ -46,31 +51,41 @@ class TestDatabaseManager(unittest.TestCase):
         
         conn.close()
     
+    def test_read_only_connection(self):
+        """Test that read-only connections refuse writes"""
+        conn = self.db_manager.get_connection(read_only=True)
+        
+        with self.assertRaises(sqlite3.OperationalError):
+            conn.execute("DELETE FROM evidence_records")
+        
+        conn.close()
+    
     def test_insert_evidence_record(self):
         """Test inserting evidence record into database"""
+        now = datetime.now(timezone.utc)
         test_record = DFAS.EvidenceRecord(
             id="test-001",
             case_id="case-001",
             file_path="/test/file.txt",
             rel_path="file.txt",
             size=1024,
-            created_time=datetime.now(timezone.utc),
-            modified_time=datetime.now(timezone.utc),
-            accessed_time=datetime.now(timezone.utc),
+            created_time=now,
+            modified_time=now,
+            accessed_time=now,
             owner="test_user",
             file_type="text/plain",
             extension=".txt",
             sha256="abc123",
             yara_tags=[],
             collected_by="test_agent",
-            collected_at=datetime.now(timezone.utc),
+            collected_at=now,
             notes="Test record"
         )
         
         self.db_manager.insert_evidence(test_record)
         
         # Verify insertion
-        conn = sqlite3.connect(self.test_db.name)
+        conn = self.db_manager.get_connection(read_only=True)
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM evidence_records WHERE id=?", ("test-001",))
         result = cursor.fetchone()
@@ -79,6 +94,42 @@ class TestDatabaseManager(unittest.TestCase):
         self.assertIsNotNone(result, "Record should be inserted")
         self.assertEqual(result[0], "test-001", "Record ID should match")
 
+    def test_insert_evidence_many(self):
+        """Test inserting a batch of evidence records in one transaction"""
+        now = datetime.now(timezone.utc)
+        records = [
+            DFAS.EvidenceRecord(
+                id=f"batch-{i:03d}",
+                case_id="case-001",
+                file_path=f"/test/file{i}.txt",
+                rel_path=f"file{i}.txt",
+                size=1024,
+                created_time=now,
+                modified_time=now,
+                accessed_time=now,
+                owner="test_user",
+                file_type="text/plain",
+                extension=".txt",
+                sha256="abc123",
+                yara_tags=[],
+                collected_by="test_agent",
+                collected_at=now,
+                notes="Batch record"
+            )
+            for i in range(3)
+        ]
+        
+        self.db_manager.insert_evidence_many(records)
+        
+        # Verify insertion
+        conn = self.db_manager.get_connection(read_only=True)
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM evidence_records ORDER BY id")
+        result = [row[0] for row in cursor.fetchall()]
+        conn.close()
+        
+        self.assertEqual(result, ["batch-000", "batch-001", "batch-002"], "All batch records should be inserted")
+
 class TestProcessingAgent(unittest.TestCase):
     """Test file processing functionality"""
     
@@ -119,6 +170,18 @@ class TestProcessingAgent(unittest.TestCase):
         expected_hash = hashlib.sha256(b"Test content for hashing").hexdigest()
         self.assertEqual(calculated_hash, expected_hash, "Hash should match expected value")
     
+    def test_sha256_without_mmap(self):
+        """Test that large files are still hashed when mmap is unavailable"""
+        large_file = os.path.join(self.test_dir, "large.bin")
+        content = os.urandom(DFAS.MMAP_HASH_THRESHOLD + DFAS.HASH_CHUNK_SIZE // 2)
+        with open(large_file, 'wb') as f:
+            f.write(content)
+        
+        with mock.patch.object(DFAS.mmap, 'mmap', side_effect=OSError("mmap not supported")):
+            calculated_hash = self.agent.calculate_sha256(large_file)
+        
+        self.assertEqual(calculated_hash, hashlib.sha256(content).hexdigest(), "Should fall back to chunked hashing")
+    
     def test_file_type_detection(self):
         """Test file type detection functionality"""
         file_type = self.agent.get_file_type(self.test_file)
@@ -126,6 +189,59 @@ class TestProcessingAgent(unittest.TestCase):
         self.assertIsNotNone(file_type, "File type should not be None")
         self.assertIn("text", file_type.lower(), "Should detect as text file")
     
+    def test_file_type_signature_detection(self):
+        """Test that file content signatures take precedence over extension"""
+        png_file = os.path.join(self.test_dir, "image.dat")
+        with open(png_file, 'wb') as f:
+            f.write(b'\x89PNG\r\n\x1a\n' + b'\x00' * 16)
+        
+        docx_file = os.path.join(self.test_dir, "report.docx")
+        with open(docx_file, 'wb') as f:
+            f.write(b'PK\x03\x04' + b'\x00' * 16)
+        
+        self.assertEqual(self.agent.get_file_type(png_file), "image/png", "Should detect PNG signature")
+        self.assertIn("wordprocessingml", self.agent.get_file_type(docx_file), "Should keep office type for ZIP containers")
+    
+    def test_file_type_disguised_zip(self):
+        """Test that a ZIP renamed to another extension is still reported as ZIP"""
+        for name in ["evil.pdf", "evil.txt", "evil.exe"]:
+            disguised_file = os.path.join(self.test_dir, name)
+            with open(disguised_file, 'wb') as f:
+                f.write(b'PK\x03\x04' + b'\x00' * 16)
+            
+            self.assertEqual(self.agent.get_file_type(disguised_file), "application/zip", f"{name} should be detected as ZIP")
+        
+        deck_file = os.path.join(self.test_dir, "deck.pptx")
+        with open(deck_file, 'wb') as f:
+            f.write(b'PK\x03\x04' + b'\x00' * 16)
+        
+        self.assertIn("presentationml", self.agent.get_file_type(deck_file), "Should keep PowerPoint type for ZIP containers")
+    
+    def test_file_type_uses_libmagic_for_unknown_content(self):
+        """Test that content outside the signature table is classified by libmagic, not by name"""
+        fake_pdf = os.path.join(self.test_dir, "fake.pdf")
+        with open(fake_pdf, 'wb') as f:
+            f.write(b'Rar!\x1a\x07\x00' + b'\x00' * 16)
+        
+        self.agent.magic_detector = mock.Mock()
+        self.agent.magic_detector.from_file.return_value = "application/x-rar"
+        
+        self.assertEqual(self.agent.get_file_type(fake_pdf), "application/x-rar", "Should use libmagic before the extension")
+        self.agent.magic_detector.from_file.assert_called_once_with(fake_pdf)
+    
+    def test_file_type_pe_detection(self):
+        """Test that only files with a PE header are detected as executables"""
+        text_file = os.path.join(self.test_dir, "notes.txt")
+        with open(text_file, 'w') as f:
+            f.write("MZ Holdings meeting notes. " * 4)
+        
+        pe_file = os.path.join(self.test_dir, "program.txt")
+        with open(pe_file, 'wb') as f:
+            f.write(b'MZ' + b'\x00' * 0x3A + (0x40).to_bytes(4, 'little') + b'PE\x00\x00')
+        
+        self.assertEqual(self.agent.get_file_type(text_file), "text/plain", "Text starting with MZ is not an executable")
+        self.assertEqual(self.agent.get_file_type(pe_file), "application/x-dosexec", "Should detect PE executable")
+    
     def test_metadata_extraction(self):
         """Test complete metadata extraction process"""
         record = self.agent.extract_metadata(self.test_file)
@@ -186,7 +302,7 @@ class TestDiscoveryAgent(unittest.TestCase):
         found_extensions = []
         while not self.file_queue.empty():
             file_path = self.file_queue.get()
-            found_extensions.append(Path(file_path).suffix)
+            found_extensions.append(os.path.splitext(file_path)[1])
         
         # Should not find .exe file
         self.assertNotIn('.exe', found_extensions, "Should not discover .exe files")
@@ -195,12 +311,60 @@ class TestDiscoveryAgent(unittest.TestCase):
         for ext in ['.txt', '.pdf', '.docx', '.jpg']:
             self.assertIn(ext, found_extensions, f"Should discover {ext} files")
     
+    def test_compound_extension_filtering(self):
+        """Test that multi-part extensions such as .tar.gz are matched"""
+        agent = DFAS.DiscoveryAgent(self.db_manager, dict(self.config, target_extensions=['.tar.gz', '.TXT']))
+        
+        self.assertTrue(agent.matches_extension("backup.tar.gz"), "Should match compound extension")
+        self.assertFalse(agent.matches_extension("backup.gz"), "Should not match partial extension")
+        self.assertTrue(agent.matches_extension("notes.txt"), "Should match case-insensitively")
+        self.assertFalse(agent.matches_extension(".txt"), "Hidden file name is not an extension")
+    
+    def test_stat_cache_sharing(self):
+        """Test that discovery stat results are reused by processing"""
+        stat_cache = {}
+        self.agent.set_stat_cache(stat_cache)
+        self.agent.discover_files()
+        
+        queue_contents = []
+        while not self.file_queue.empty():
+            queue_contents.append(self.file_queue.get())
+        
+        self.assertEqual(sorted(stat_cache), sorted(queue_contents), "Every discovered file should be cached")
+        
+        processing = DFAS.ProcessingAgent(self.db_manager, {'case_id': 'test-case'})
+        processing.set_stat_cache(stat_cache)
+        record = processing.extract_metadata(queue_contents[0])
+        
+        self.assertEqual(record.size, os.path.getsize(queue_contents[0]), "Recorded size should match file")
+        self.assertEqual(record.notes, "", "Unchanged file should not be flagged")
+        self.assertNotIn(queue_contents[0], stat_cache, "Processed file should be removed from cache")
+        
+        # Modify a file after discovery; metadata must follow the hashed content
+        changed_file = queue_contents[1]
+        with open(changed_file, 'a') as f:
+            f.write(" appended after discovery")
+        record = processing.extract_metadata(changed_file)
+        
+        self.assertEqual(record.size, os.path.getsize(changed_file), "Size should match hashed content")
+        with open(changed_file, 'rb') as f:
+            self.assertEqual(record.sha256, hashlib.sha256(f.read()).hexdigest(), "Hash should match current content")
+        self.assertIn("changed", record.notes, "Changed file should be flagged")
+        
+        # A file that cannot be hashed must still release its cache entry
+        failed_file = queue_contents[2]
+        stat_cache[failed_file] = os.stat(failed_file)
+        os.unlink(failed_file)
+        
+        self.assertIsNone(processing.extract_metadata(failed_file), "Missing file should not produce a record")
+        self.assertNotIn(failed_file, stat_cache, "Failed file should be removed from cache")
+    
     def test_file_size_filtering(self):
         """Test that files exceeding max size are excluded"""
-        # Create a large file
+        # Create a large sparse file; only its reported size matters
         large_file = os.path.join(self.test_dir, "large.txt")
         with open(large_file, 'wb') as f:
-            f.write(b'0' * (150 * 1024 * 1024))  # 150MB
+            f.truncate(150 * 1024 * 1024)  # 150MB
         
         # Update config with smaller max size
         self.agent.max_file_size = 100 * 1024 * 1024  # 100MB
@@ -226,22 +390,23 @@ class TestPackagingAgent(unittest.TestCase):
         self.db_manager = DFAS.DatabaseManager(self.test_db.name)
         
         # Insert sample evidence record
+        now = datetime.now(timezone.utc)
         test_record = DFAS.EvidenceRecord(
             id="pkg-test-001",
             case_id="pkg-case-001",
             file_path="/test/file.txt",
             rel_path="file.txt",
             size=1024,
-            created_time=datetime.now(timezone.utc),
-            modified_time=datetime.now(timezone.utc),
-            accessed_time=datetime.now(timezone.utc),
+            created_time=now,
+            modified_time=now,
+            accessed_time=now,
             owner="test_user",
             file_type="text/plain",
             extension=".txt",
             sha256="abc123def456",
             yara_tags=[],
             collected_by="test_agent",
-            collected_at=datetime.now(timezone.utc),
+            collected_at=now,
             notes="Test packaging"
         )
         self.db_manager.insert_evidence(test_record)
@@ -258,6 +423,17 @@ class TestPackagingAgent(unittest.TestCase):
         if os.path.exists(self.test_db.name):
             os.unlink(self.test_db.name)
     
+    def test_fetch_case_evidence(self):
+        """Test fetching a case's evidence rows with column names"""
+        columns, rows = self.db_manager.fetch_case_evidence('pkg-case-001')
+        
+        self.assertEqual(columns[0], 'id', "First column should be id")
+        self.assertEqual(len(rows), 1, "Should fetch one record for the case")
+        self.assertEqual(rows[0][columns.index('sha256')], 'abc123def456', "Should fetch stored hash")
+        
+        _, other_rows = self.db_manager.fetch_case_evidence('other-case')
+        self.assertEqual(other_rows, [], "Should not fetch records from other cases")
+    
     def test_csv_export(self):
         """Test CSV report generation"""
         csv_path = self.agent.export_to_csv()
@@ -292,13 +468,67 @@ class TestPackagingAgent(unittest.TestCase):
         self.assertTrue(package_path.endswith('.zip'), "Package should be ZIP format")
         
         # Verify package hash was recorded
-        conn = sqlite3.connect(self.test_db.name)
+        conn = self.db_manager.get_connection(read_only=True)
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM chain_of_custody WHERE action='package_created'")
         result = cursor.fetchone()
         conn.close()
         
         self.assertIsNotNone(result, "Chain of custody entry should exist")
+        
+        # Verify recorded hash matches the package on disk
+        self.assertEqual(result[6], self.agent.calculate_file_hash(package_path), "Recorded hash should match package")
+        
+        # Verify package is a valid archive
+        with zipfile.ZipFile(package_path) as zipf:
+            self.assertIsNone(zipf.testzip(), "Package members should be intact")
+            self.assertIn("evidence.db", zipf.namelist(), "Package should contain database")
+
+    def test_package_includes_uncheckpointed_records(self):
+        """Test that records still in the WAL are included in the packaged database"""
+        # An open reader stops SQLite from checkpointing the WAL on close
+        reader = self.db_manager.get_connection(read_only=True)
+        reader.execute("SELECT COUNT(*) FROM evidence_records").fetchone()
+        
+        now = datetime.now(timezone.utc)
+        records = [
+            DFAS.EvidenceRecord(
+                id=f"pkg-wal-{i:03d}",
+                case_id="pkg-case-001",
+                file_path=f"/test/wal{i}.txt",
+                rel_path=f"wal{i}.txt",
+                size=1024,
+                created_time=now,
+                modified_time=now,
+                accessed_time=now,
+                owner="test_user",
+                file_type="text/plain",
+                extension=".txt",
+                sha256="abc123def456",
+                yara_tags=[],
+                collected_by="test_agent",
+                collected_at=now,
+                notes="WAL record"
+            )
+            for i in range(2)
+        ]
+        self.db_manager.insert_evidence_many(records)
+        
+        try:
+            package_path = self.agent.create_package()
+        finally:
+            reader.close()
+        
+        # Open the packaged database and count its records
+        extract_dir = os.path.join(self.test_dir, "extracted")
+        with zipfile.ZipFile(package_path) as zipf:
+            db_path = zipf.extract("evidence.db", extract_dir)
+        
+        conn = sqlite3.connect(db_path)
+        count = conn.execute("SELECT COUNT(*) FROM evidence_records").fetchone()[0]
+        conn.close()
+        
+        self.assertEqual(count, 3, "Packaged database should contain all committed records")
 
 class TestIntegration(unittest.TestCase):
     """Integration tests for complete workflow"""
@@ -347,11 +577,12 @@ class TestIntegration(unittest.TestCase):
         processing = DFAS.ProcessingAgent(db_manager, config)
         processing.set_file_queue(file_queue)
         
+        file_paths = []
         while not file_queue.empty():
-            file_path = file_queue.get()
-            record = processing.extract_metadata(file_path)
-            self.assertIsNotNone(record, f"Should process {file_path}")
-            db_manager.insert_evidence(record)
+            file_paths.append(file_queue.get())
+        
+        records = processing.process_batch(file_paths)
+        self.assertEqual(len(records), 3, "Should process all 3 files")
         
         # Packaging phase
         packaging = DFAS.PackagingAgent(db_manager, config)
@@ -360,7 +591,7 @@ class TestIntegration(unittest.TestCase):
         self.assertTrue(os.path.exists(package_path), "Package should be created")
         
         # Verify database has all records
-        conn = sqlite3.connect(self.test_db.name)
+        conn = db_manager.get_connection(read_only=True)
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM evidence_records")
         count = cursor.fetchone()[0]
@@ -368,34 +599,61 @@ class TestIntegration(unittest.TestCase):
         
         self.assertEqual(count, 3, "Database should contain 3 evidence records")
 
-def run_tests_with_report():
-    """Run all tests and generate detailed report"""
-    # Create test suite
+TEST_CASES = [
+    TestDatabaseManager,
+    TestProcessingAgent,
+    TestDiscoveryAgent,
+    TestPackagingAgent,
+    TestIntegration,
+]
+
+def run_test_case(test_case_name):
+    """Run one test class in a worker process and return its output and counts"""
     loader = unittest.TestLoader()
-    suite = unittest.TestSuite()
+    suite = loader.loadTestsFromTestCase(getattr(sys.modules[__name__], test_case_name))
     
-    # Add all test classes
-    suite.addTests(loader.loadTestsFromTestCase(TestDatabaseManager))
-    suite.addTests(loader.loadTestsFromTestCase(TestProcessingAgent))
-    suite.addTests(loader.loadTestsFromTestCase(TestDiscoveryAgent))
-    suite.addTests(loader.loadTestsFromTestCase(TestPackagingAgent))
-    suite.addTests(loader.loadTestsFromTestCase(TestIntegration))
+    # Buffer runner and console log output so results from parallel
+    # workers do not interleave; the log file handler is left alone
+    stream = io.StringIO()
+    console_handlers = [
+        handler for handler in logging.getLogger().handlers
+        if type(handler) is logging.StreamHandler
+    ]
+    previous_streams = [handler.setStream(stream) for handler in console_handlers]
+    try:
+        runner = unittest.TextTestRunner(stream=stream, verbosity=2)
+        result = runner.run(suite)
+    finally:
+        for handler, previous_stream in zip(console_handlers, previous_streams):
+            handler.setStream(previous_stream)
+    
+    return stream.getvalue(), result.testsRun, len(result.failures), len(result.errors)
+
+def run_tests_with_report(processes=None):
+    """Run all tests in parallel and generate detailed report"""
+    # Each test class uses its own temporary directory and database, so
+    # classes run independently in separate processes
+    with ProcessPoolExecutor(max_workers=processes or os.cpu_count()) as executor:
+        outcomes = list(executor.map(run_test_case, [test_case.__name__ for test_case in TEST_CASES]))
     
-    # Run tests with verbose output
-    runner = unittest.TextTestRunner(verbosity=2)
-    result = runner.run(suite)
+    tests_run = failures = errors = 0
+    for output, case_run, case_failures, case_errors in outcomes:
+        sys.stderr.write(output)
+        tests_run += case_run
+        failures += case_failures
+        errors += case_errors
     
     # Print summary
     print("\n" + "="*70)
     print("TEST SUMMARY")
     print("="*70)
-    print(f"Tests run: {result.testsRun}")
-    print(f"Successes: {result.testsRun - len(result.failures) - len(result.errors)}")
-    print(f"Failures: {len(result.failures)}")
-    print(f"Errors: {len(result.errors)}")
+    print(f"Tests run: {tests_run}")
+    print(f"Successes: {tests_run - failures - errors}")
+    print(f"Failures: {failures}")
+    print(f"Errors: {errors}")
     print("="*70)
     
-    return result.wasSuccessful()
+    return failures == 0 and errors == 0
 
 if __name__ == '__main__':
     success = run_tests_with_report()